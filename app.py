@@ -1,10 +1,13 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import CNX_POOL_MAXSIZE, MySQLConnectionPool
 import os
+import time
+import re
 import json
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,6 +20,30 @@ DB_CONFIG = {
     'password': os.getenv('MYSQL_PASSWORD'),
     'database': os.getenv('MYSQL_DATABASE', 'medisearch_db')
 }
+DB_POOL_SIZE_REQUESTED = os.getenv('MYSQL_POOL_SIZE', '10')
+try:
+    # mysql-connector refuses pools larger than CNX_POOL_MAXSIZE
+    DB_POOL_SIZE = min(max(int(DB_POOL_SIZE_REQUESTED), 1), CNX_POOL_MAXSIZE)
+except ValueError:
+    DB_POOL_SIZE = 10
+# How long a query waits for a free pooled connection before failing
+DB_POOL_WAIT_SECONDS = 5.0
+CUSTOM_QUERY_TIMEOUT_MS_REQUESTED = os.getenv('CUSTOM_QUERY_TIMEOUT_MS', '2000')
+CUSTOM_QUERY_TIMEOUT_MAX_MS = 60000
+try:
+    # MAX_EXECUTION_TIME rejects negative values; 0 would disable the limit
+    CUSTOM_QUERY_TIMEOUT_MS = min(max(int(CUSTOM_QUERY_TIMEOUT_MS_REQUESTED), 1), CUSTOM_QUERY_TIMEOUT_MAX_MS)
+except ValueError:
+    CUSTOM_QUERY_TIMEOUT_MS = 2000
+READ_ONLY_PREFIXES = ('select', 'with', 'explain')
+INDEXES_SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema', 'indexes.sql')
+
+# Search type labels mapped to search_medicines_db modes
+SEARCH_TYPES = {
+    "Both": "both",
+    "Medicine Only": "medicine",
+    "Symptoms Only": "symptom"
+}
 
 # Page configuration
 st.set_page_config(
@@ -35,18 +62,31 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_resource
-def get_db_connection():
-    """Establish MySQL connection with status display"""
+def get_db_pool():
+    """Create a shared MySQL connection pool with status display"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
+        pool = MySQLConnectionPool(
+            pool_name="medi",
+            pool_size=DB_POOL_SIZE,
+            pool_reset_session=False,
+            # Sessions are reused across checkouts, so never leave a read
+            # transaction (and its snapshot) open between queries
+            autocommit=True,
+            **DB_CONFIG
+        )
+        connection = get_pooled_connection(pool)
+        try:
             db_info = connection.get_server_info()
-            st.markdown(f"""
-            <div class="db-status">
-                ✅ **MySQL Connected!** Server: {db_info} | Database: {DB_CONFIG['database']}
-            </div>
-            """, unsafe_allow_html=True)
-            return connection
+        finally:
+            connection.close()
+        st.markdown(f"""
+        <div class="db-status">
+            ✅ **MySQL Connected!** Server: {db_info} | Database: {DB_CONFIG['database']} | Pool: {DB_POOL_SIZE}
+        </div>
+        """, unsafe_allow_html=True)
+        if str(DB_POOL_SIZE) != DB_POOL_SIZE_REQUESTED.strip():
+            st.warning(f"⚠️ MYSQL_POOL_SIZE={DB_POOL_SIZE_REQUESTED!r} is not a whole number between 1 and {CNX_POOL_MAXSIZE}; using {DB_POOL_SIZE}.")
+        return pool
     except Error as e:
         st.error(f"❌ **Database Connection Failed:** {e}")
         st.info("""
@@ -57,45 +97,188 @@ def get_db_connection():
         """)
         return None
 
-def execute_query(connection, query, params=None):
-    """Execute SQL query with reconnection"""
+def get_pooled_connection(pool, wait_seconds=DB_POOL_WAIT_SECONDS):
+    """Check out a pooled connection, waiting briefly while the pool is exhausted"""
+    # pool.get_connection() never blocks; it raises PoolError when all
+    # connections are in use, so retry until one is returned or time runs out
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        try:
+            return pool.get_connection()
+        except PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+def execute_query(pool, query, params=None):
+    """Execute SQL query on a connection checked out from the pool"""
+    # Errors propagate so st.cache_data never stores a failed result;
+    # pages report them through query_or_default()
+    connection = None
+    cursor = None
     try:
-        if connection and connection.is_connected():
-            connection.ping(reconnect=True, attempts=3, delay=1)
-        else:
-            st.warning("⚠️ Connection not established. Reconnecting...")
-            connection = get_db_connection()
-            if not connection or not connection.is_connected():
-                st.error("❌ Failed to reconnect to database")
-                return pd.DataFrame()
-        
-        cursor = connection.cursor(dictionary=True)
+        connection = get_pooled_connection(pool)
+        cursor = connection.cursor()
         cursor.execute(query, params or ())
-        results = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description] if cursor.description else []
-        cursor.close()
-        df = pd.DataFrame(results, columns=columns)
+        # Plain tuples skip building a dict per row
+        df = pd.DataFrame.from_records(cursor.fetchall() if columns else [], columns=columns)
         return df
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None:
+            # Returns the connection to the pool
+            connection.close()
+
+def query_or_default(loader, *args, default=None):
+    """Call a (cached) query helper, showing database errors instead of raising"""
+    try:
+        return loader(*args)
     except Error as e:
-        st.error(f"❌ **Query Error:** {e} | Query: {query[:100]}...")
-        return pd.DataFrame()
+        st.error(f"❌ **Query Error:** {e}")
+        return pd.DataFrame() if default is None else default
 
-def load_medicines_from_db(connection):
-    """Load medicines with aggregated purchase info, ensuring no duplicates"""
+@st.cache_resource
+def ensure_indexes():
+    """Create any index from schema/indexes.sql that does not exist yet"""
+    try:
+        with open(INDEXES_SQL_PATH, encoding='utf-8') as f:
+            script = "\n".join(line for line in f if not line.lstrip().startswith('--'))
+    except OSError as e:
+        st.warning(f"⚠️ **Index setup incomplete:** {e} | Run schema/indexes.sql manually.")
+        return []
+    statements = [stmt.strip() for stmt in script.split(';') if stmt.strip()]
+    
+    connection = None
+    cursor = None
+    created = []
+    try:
+        connection = get_pooled_connection(get_db_pool())
+        cursor = connection.cursor()
+        for stmt in statements:
+            match = re.match(r"CREATE\s+(?:FULLTEXT\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)", stmt, re.IGNORECASE)
+            if not match:
+                continue
+            index_name, table_name = match.groups()
+            cursor.execute("""
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+            LIMIT 1
+            """, (table_name, index_name))
+            if cursor.fetchall():
+                continue
+            cursor.execute(stmt)
+            created.append(index_name)
+    except Error as e:
+        st.warning(f"⚠️ **Index setup incomplete:** {e} | Run schema/indexes.sql manually.")
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None:
+            connection.close()
+    return created
+
+def execute_read_only_query(pool, query, timeout_ms=CUSTOM_QUERY_TIMEOUT_MS):
+    """Execute user-supplied SQL in a read-only transaction with a statement timeout"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_pooled_connection(pool)
+        cursor = connection.cursor()
+        cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (timeout_ms,))
+        cursor.execute("START TRANSACTION READ ONLY")
+        cursor.execute(query)
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        df = pd.DataFrame.from_records(cursor.fetchall() if columns else [], columns=columns)
+        return df
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None:
+            # The pool does not reset sessions, and user SQL can leave behind
+            # the timeout, user variables or GET_LOCK locks. Reset the session
+            # before returning it; if that fails, drop the socket so the pool
+            # reconnects a clean session on the next checkout.
+            try:
+                connection.reset_session()
+                reset_cursor = connection.cursor()
+                reset_cursor.execute("SET SESSION autocommit = 1")
+                reset_cursor.close()
+            except Error:
+                try:
+                    connection.disconnect()
+                except Error:
+                    pass
+            connection.close()
+
+def strip_quoted(sql):
+    """SQL text with quoted strings and identifiers removed"""
+    return re.sub(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`", "", sql)
+
+def has_multiple_statements(sql):
+    """True if the SQL contains a ';' outside quoted strings and identifiers"""
+    return ';' in strip_quoted(sql)
+
+def accesses_server_files(sql):
+    """True if the SQL reads or writes files on the server (INTO OUTFILE/DUMPFILE, LOAD_FILE)"""
+    # A read-only transaction does not block these. Comment markers become
+    # spaces so INTO/**/OUTFILE and /*! ... */ executable comments are caught.
+    unquoted = re.sub(r"/\*!?\d*|\*/", " ", strip_quoted(sql))
+    return re.search(r"\bINTO\s+(?:OUTFILE|DUMPFILE)\b|\bLOAD_FILE\s*\(", unquoted, re.IGNORECASE) is not None
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_query(sql, params=()):
+    """Memoized read query, keyed on the SQL text and parameter tuple"""
+    return execute_query(get_db_pool(), sql, params)
+
+def compact_medicine_dtypes(df):
+    """Store type as categorical and rating/price as float32"""
+    if df.empty:
+        return df
+    df['type'] = df['type'].astype('category')
+    df[['rating', 'price']] = df[['rating', 'price']].astype('float32')
+    return df
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_medicines_from_db():
+    """Load medicines with aggregated purchase info"""
     query = """
-    SELECT m.*, 
-           (SELECT COUNT(DISTINCT ph.id) FROM purchase_history ph WHERE ph.medicine_id = m.id) as purchase_count
+    SELECT m.name, m.type, m.treats, m.rating, m.price, m.reviews,
+           COUNT(DISTINCT ph.id) as purchase_count
     FROM medicines m
-    GROUP BY m.id, m.name, m.type, m.treats, m.rating, m.price, m.reviews
+    LEFT JOIN purchase_history ph ON ph.medicine_id = m.id
+    GROUP BY m.id
     ORDER BY m.rating DESC
     """
-    df = execute_query(connection, query)
-    if not df.empty:
-        # Ensure no duplicates by dropping based on name if any persist
-        df = df.drop_duplicates('name', keep='first')
-    return df
+    return compact_medicine_dtypes(execute_query(get_db_pool(), query))
 
-def get_user_history(connection, user_id):
+@st.cache_data(ttl=60, show_spinner=False)
+def load_table_counts():
+    """Row counts for every table in a single round trip"""
+    query = """
+    SELECT 'medicines' AS t, COUNT(*) AS c FROM medicines
+    UNION ALL SELECT 'users', COUNT(*) FROM users
+    UNION ALL SELECT 'purchase_history', COUNT(*) FROM purchase_history
+    """
+    df = execute_query(get_db_pool(), query)
+    return dict(zip(df['t'], df['c'])) if not df.empty else {}
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_static_lookups():
+    """Users for the sidebar dropdown and the featured medicines, fetched together"""
+    pool = get_db_pool()
+    users_df = execute_query(pool, "SELECT DISTINCT id, name, profile FROM users ORDER BY name")
+    featured_df = execute_query(pool, """
+    SELECT name, type, treats, rating, price
+    FROM medicines
+    ORDER BY rating DESC
+    LIMIT 6
+    """)
+    return users_df, featured_df
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_user_history(user_id):
     """Get aggregated user purchase history"""
     query = """
     SELECT m.name, m.type, m.rating, m.price,
@@ -107,111 +290,89 @@ def get_user_history(connection, user_id):
     GROUP BY m.id, m.name, m.type, m.rating, m.price
     ORDER BY latest_purchase_date DESC
     """
-    return execute_query(connection, query, (user_id,))
+    return compact_medicine_dtypes(execute_query(get_db_pool(), query, (user_id,)))
 
-def search_medicines_db(connection, query, search_type="both"):
-    """Advanced search with SQL full-text capabilities"""
-    query_lower = f"%{query.lower()}%"
-    
+@st.cache_data(ttl=120, show_spinner=False)
+def search_medicines_db(query, search_type="both"):
+    """Full-text search ranked by MATCH() relevance, cached per query string"""
     if search_type == "medicine":
-        search_query = """
-        SELECT *, 
-               CASE 
-                   WHEN name LIKE %s THEN 2
-                   ELSE 0 
-               END as relevance_score
-        FROM medicines 
-        WHERE name LIKE %s
-        ORDER BY relevance_score DESC, rating DESC
-        """
-        params = (query_lower, query_lower)
+        match_expr = "MATCH(name) AGAINST(%s IN NATURAL LANGUAGE MODE)"
     elif search_type == "symptom":
-        search_query = """
-        SELECT *, 
-               CASE 
-                   WHEN treats LIKE %s THEN 1
-                   ELSE 0 
-               END as relevance_score
-        FROM medicines 
-        WHERE treats LIKE %s
-        ORDER BY relevance_score DESC, rating DESC
-        """
-        params = (query_lower, query_lower)
+        match_expr = "MATCH(treats) AGAINST(%s IN NATURAL LANGUAGE MODE)"
     else:  # both
-        search_query = """
-        SELECT *, 
-               CASE 
-                   WHEN name LIKE %s THEN 2
-                   WHEN treats LIKE %s THEN 1
-                   ELSE 0 
-               END as relevance_score
-        FROM medicines 
-        WHERE name LIKE %s OR treats LIKE %s
-        ORDER BY relevance_score DESC, rating DESC
-        """
-        params = (query_lower, query_lower, query_lower, query_lower)
+        match_expr = "MATCH(name, treats) AGAINST(%s IN NATURAL LANGUAGE MODE)"
+    
+    search_query = f"""
+    SELECT *, {match_expr} as relevance_score,
+           MATCH(name) AGAINST(%s IN NATURAL LANGUAGE MODE) > 0 as name_match
+    FROM medicines 
+    WHERE {match_expr}
+    ORDER BY relevance_score DESC, rating DESC
+    LIMIT 50
+    """
+    params = (query, query, query)
     
-    return execute_query(connection, search_query, params)
+    return execute_query(get_db_pool(), search_query, params)
 
-def generate_recommendations_db(connection, user_history_names):
-    """Generate recommendations and return as JSON-compatible dict"""
+def generate_recommendations_db(user_history_names):
+    """Generate recommendation records (display columns) and a JSON-compatible dict"""
     if not user_history_names:
         return [], {}
     
-    placeholders = ','.join(['%s'] * len(user_history_names))
-    
-    category_query = f"""
-    SELECT DISTINCT m2.name, m2.rating, m2.type,
-           COUNT(ph.id) as popularity_score
-    FROM medicines m1
-    JOIN medicines m2 ON m1.type = m2.type
-    LEFT JOIN purchase_history ph ON m2.id = ph.medicine_id
-    WHERE m1.name IN ({placeholders})
-    AND m2.name NOT IN ({placeholders})
-    GROUP BY m2.id, m2.name, m2.rating, m2.type
-    ORDER BY m2.rating DESC, popularity_score DESC
-    LIMIT 3
-    """
-    
-    category_recs = execute_query(connection, category_query, user_history_names + user_history_names)
-    
-    symptom_query = f"""
-    SELECT DISTINCT m2.name, m2.rating,
-           (SELECT COUNT(*) FROM purchase_history ph WHERE ph.medicine_id = m2.id) as popularity
-    FROM medicines m1
-    JOIN medicines m2 ON (
-        m2.treats LIKE CONCAT('%', SUBSTRING_INDEX(m1.treats, ',', 1), '%') OR
-        m1.treats LIKE CONCAT('%', SUBSTRING_INDEX(m2.treats, ',', 1), '%')
+    # Category, symptom and popularity candidates in one round trip; each
+    # branch keeps its own limit, duplicates resolve to the earliest source.
+    # History is bound as one JSON array so the statement text never changes.
+    recommendations_query = """
+    WITH hist AS (
+        SELECT m.id, m.name, m.type, m.treats
+        FROM JSON_TABLE(%s, '$[*]' COLUMNS(name VARCHAR(100) PATH '$')) j
+        JOIN medicines m ON m.name = j.name
+    ),
+    pop AS (
+        SELECT medicine_id, COUNT(*) AS c FROM purchase_history GROUP BY medicine_id
+    ),
+    candidates AS (
+        (SELECT m2.name, m2.type, m2.treats, m2.rating, m2.price, 1 AS priority, 'category' AS source
+         FROM medicines m2
+         LEFT JOIN pop ON pop.medicine_id = m2.id
+         WHERE m2.type IN (SELECT type FROM hist)
+         AND m2.name NOT IN (SELECT name FROM hist)
+         ORDER BY m2.rating DESC, COALESCE(pop.c, 0) DESC
+         LIMIT 3)
+        UNION ALL
+        (SELECT m2.name, m2.type, m2.treats, m2.rating, m2.price, 2 AS priority, 'symptom' AS source
+         FROM medicines m2
+         LEFT JOIN pop ON pop.medicine_id = m2.id
+         WHERE EXISTS (
+             SELECT 1 FROM hist h
+             WHERE m2.treats LIKE CONCAT('%', SUBSTRING_INDEX(h.treats, ',', 1), '%')
+             OR h.treats LIKE CONCAT('%', SUBSTRING_INDEX(m2.treats, ',', 1), '%')
+         )
+         AND m2.name NOT IN (SELECT name FROM hist)
+         ORDER BY m2.rating DESC, COALESCE(pop.c, 0) DESC
+         LIMIT 3)
+        UNION ALL
+        (SELECT m2.name, m2.type, m2.treats, m2.rating, m2.price, 3 AS priority, 'popular' AS source
+         FROM medicines m2
+         LEFT JOIN pop ON pop.medicine_id = m2.id
+         WHERE m2.name NOT IN (SELECT name FROM hist)
+         ORDER BY COALESCE(pop.c, 0) DESC, m2.rating DESC
+         LIMIT 2)
+    ),
+    ranked AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY name ORDER BY priority) AS rn
+        FROM candidates
     )
-    WHERE m1.name IN ({placeholders})
-    AND m2.name NOT IN ({placeholders})
-    ORDER BY m2.rating DESC, popularity DESC
-    LIMIT 3
-    """
-    
-    symptom_recs = execute_query(connection, symptom_query, user_history_names + user_history_names)
-    
-    popular_query = f"""
-    SELECT name, rating, reviews,
-           COUNT(ph.id) as purchase_count
-    FROM medicines m
-    LEFT JOIN purchase_history ph ON m.id = ph.medicine_id
-    WHERE m.name NOT IN ({placeholders})
-    GROUP BY m.id, m.name, m.rating, m.reviews
-    ORDER BY purchase_count DESC, rating DESC
-    LIMIT 2
+    SELECT name, type, treats, rating, price, source
+    FROM ranked
+    WHERE rn = 1
+    ORDER BY rating DESC
+    LIMIT 4
     """
     
-    popular_recs = execute_query(connection, popular_query, user_history_names)
-    
-    all_recs = pd.concat([
-        category_recs.assign(source='category'),
-        symptom_recs.assign(source='symptom'),
-        popular_recs.assign(source='popular')
-    ], ignore_index=True)
-    
-    unique_recs = all_recs.drop_duplicates('name').sort_values('rating', ascending=False)
-    top_recs = unique_recs.head(4)
+    top_recs = cached_query(recommendations_query, (json.dumps(user_history_names),)).to_dict('records')
+    if not top_recs:
+        return [], {}
     
     # Create JSON-compatible dictionary
     json_response = {
@@ -221,16 +382,29 @@ def generate_recommendations_db(connection, user_history_names):
                 "type": row['type'] if 'type' in row else None,
                 "rating": float(row['rating']) if row['rating'] else 0.0,
                 "source": row['source']
-            } for _, row in top_recs.iterrows()
+            } for row in top_recs
         ],
         "based_on_history": user_history_names,
-        "timestamp": pd.Timestamp.now().isoformat()
+        "timestamp": datetime.now().isoformat()
     }
     
-    return top_recs['name'].tolist(), json_response
+    return top_recs, json_response
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_history_profile(history_names):
+    """Lower-cased symptom set and category set of the given history medicines"""
+    query = """
+    SELECT m.treats, m.type
+    FROM JSON_TABLE(%s, '$[*]' COLUMNS(name VARCHAR(100) PATH '$')) j
+    JOIN medicines m ON m.name = j.name
+    """
+    user_meds = execute_query(get_db_pool(), query, (json.dumps(list(history_names)),))
+    user_treats_set = {s.strip().lower() for t in user_meds.get('treats', []) for s in str(t).split(',')}
+    user_types_set = set(user_meds.get('type', []))
+    return user_treats_set, user_types_set
 
 def display_medicine_card_db(med_row):
-    """Display medicine card from database results"""
+    """Display medicine card from a database result record (dict)"""
     col1, col2, col3 = st.columns([3, 1, 1])
     
     with col1:
@@ -265,34 +439,38 @@ def display_medicine_card_db(med_row):
         </div>
         """, unsafe_allow_html=True)
 
+def set_search_query(value):
+    """Widget callback that sets the search box before the next rerun"""
+    st.session_state.search_query = value
+
 # Main application
 def main():
-    # Database Connection
-    connection = get_db_connection()
-    if not connection:
+    # Database Connection Pool
+    pool = get_db_pool()
+    if not pool:
         st.stop()
+    ensure_indexes()
     
     # Load all data
-    df_medicines = load_medicines_from_db(connection)
+    df_medicines = query_or_default(load_medicines_from_db)
+    users_df, featured = query_or_default(load_static_lookups, default=(pd.DataFrame(), pd.DataFrame()))
     
     # Sidebar - User Selection for Real History
     st.sidebar.header("👤 User Profile")
-    users_df = execute_query(connection, "SELECT id, name, profile FROM users ORDER BY name")
     if not users_df.empty:
-        # Remove any potential duplicates
-        users_df = users_df.drop_duplicates(subset=['id', 'name', 'profile'])
+        id2name = dict(zip(users_df['id'], users_df['name']))
         selected_user_id = st.sidebar.selectbox(
             "Select User:",
             options=users_df['id'].tolist(),
-            format_func=lambda x: users_df[users_df['id'] == x]['name'].iloc[0],
+            format_func=id2name.get,
             key="user_select"
         )
-        user_history_df = get_user_history(connection, selected_user_id)
+        user_history_df = query_or_default(get_user_history, selected_user_id)
         user_history_names = user_history_df['name'].tolist() if not user_history_df.empty else []
         
         if user_history_names:
-            history_display = [f"{name} (Qty: {row['total_quantity']}, Last: {row['latest_purchase_date'].strftime('%Y-%m-%d')})" 
-                             for name, row in zip(user_history_df['name'], user_history_df.to_dict('records'))]
+            history_display = [f"{row.name} (Qty: {row.total_quantity}, Last: {row.latest_purchase_date.strftime('%Y-%m-%d')})" 
+                             for row in user_history_df.itertuples(index=False)]
             st.sidebar.success(f"📋 History: {', '.join(history_display)}")
         else:
             st.sidebar.info("No purchase history for this user.")
@@ -321,28 +499,30 @@ def main():
         st.header("🔍 Database-Powered Search")
         st.markdown("*Real-time queries against MySQL database*")
         
-        col1, col2, col3 = st.columns([3, 1, 1])
-        with col1:
-            search_query = st.text_input(
-                "🔍 Search medicines or symptoms:",
-                placeholder="e.g., Aspirin, headache, diabetes, erectile dysfunction",
-                key="search_query",
-                help="Database searches in real-time"
-            )
-        with col2:
-            search_type = st.selectbox("Search Type:", ["Both", "Medicine Only", "Symptoms Only"])
-        with col3:
-            if st.button("Clear Search"):
-                st.session_state.search_query = ""
-                st.rerun()
+        # Inside a form the query only reaches the database on submit,
+        # not on every edit of the text box
+        with st.form("search_form"):
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                search_query = st.text_input(
+                    "🔍 Search medicines or symptoms:",
+                    placeholder="e.g., Aspirin, headache, diabetes, erectile dysfunction",
+                    key="search_query",
+                    help="Press Enter or click Search to query the database"
+                )
+            with col2:
+                search_type = st.selectbox("Search Type:", list(SEARCH_TYPES))
+            with col3:
+                st.form_submit_button("🔍 Search")
+        st.button("Clear Search", on_click=set_search_query, args=("",))
         
         if search_query:
             with st.spinner(f"Searching database for '{search_query}'..."):
-                results = search_medicines_db(connection, search_query, search_type.lower().replace(" ", "_"))
+                results = query_or_default(search_medicines_db, search_query, SEARCH_TYPES[search_type])
                 
                 if not results.empty:
                     st.success(f"✅ **{len(results)} results** found")
-                    name_matches = len(results[results['name'].str.lower().str.contains(search_query.lower(), na=False)])
+                    name_matches = int(results['name_match'].sum())
                     symptom_matches = len(results) - name_matches
                     
                     col_a, col_b = st.columns(2)
@@ -351,29 +531,34 @@ def main():
                     with col_b:
                         st.metric("Symptom Matches", symptom_matches)
                     
-                    for i, (_, med) in enumerate(results.head(10).iterrows(), 1):
-                        st.markdown(f"**{i}.**")
-                        display_medicine_card_db(med)
-                        if i % 3 == 0:
-                            st.markdown("---")
+                    # Card for the best match, one table for the rest of the list
+                    top_results = results.head(10)
+                    display_medicine_card_db(top_results.iloc[0].to_dict())
+                    
+                    if len(top_results) > 1:
+                        st.dataframe(
+                            top_results.iloc[1:][['name', 'type', 'treats', 'rating', 'price']].astype({'rating': float, 'price': float}),
+                            use_container_width=True,
+                            hide_index=True,
+                            column_config={
+                                'name': st.column_config.TextColumn("Name"),
+                                'type': st.column_config.TextColumn("Type"),
+                                'treats': st.column_config.TextColumn("Treats"),
+                                'rating': st.column_config.ProgressColumn("Rating", format="%.1f", min_value=0, max_value=10),
+                                'price': st.column_config.NumberColumn("Price", format="$%.2f")
+                            }
+                        )
                 else:
                     st.warning(f"❌ No results found for '{search_query}'")
                     st.info("💡 Try these common searches:")
                     col1, col2, col3 = st.columns(3)
-                    if col1.button("Headache"): 
-                        st.session_state.search_query = "headache"
-                        st.rerun()
-                    if col2.button("Diabetes"): 
-                        st.session_state.search_query = "diabetes"
-                        st.rerun()
-                    if col3.button("Cholesterol"): 
-                        st.session_state.search_query = "cholesterol"
-                        st.rerun()
+                    col1.button("Headache", on_click=set_search_query, args=("headache",))
+                    col2.button("Diabetes", on_click=set_search_query, args=("diabetes",))
+                    col3.button("Cholesterol", on_click=set_search_query, args=("cholesterol",))
         else:
             st.subheader("🌟 Top Rated Medicines (Database)")
-            featured = execute_query(connection, "SELECT * FROM medicines ORDER BY rating DESC LIMIT 6")
             cols = st.columns(3)
-            for i, (_, med) in enumerate(featured.iterrows()):
+            for i, med in enumerate(featured.to_dict('records')):
                 with cols[i % 3]:
                     display_medicine_card_db(med)
     
@@ -384,15 +569,11 @@ def main():
             st.success(f"🤖 Analyzing history: **{', '.join(history_to_use)}**")
             
             with st.spinner("Generating database recommendations..."):
-                recommendations, json_response = generate_recommendations_db(connection, history_to_use)
+                recommendations, json_response = query_or_default(generate_recommendations_db, history_to_use, default=([], {}))
                 
                 if recommendations:
                     st.markdown(f"<h3>🔥 **{len(recommendations)} Database Recommendations**</h3>", unsafe_allow_html=True)
                     
-                    placeholders_rec = ','.join(['%s'] * len(recommendations))
-                    rec_query = f"SELECT * FROM medicines WHERE name IN ({placeholders_rec}) ORDER BY FIELD(name, {placeholders_rec})"
-                    rec_df = execute_query(connection, rec_query, recommendations + recommendations)
-                    
                     st.markdown("**📊 Recommendation Strategy:**")
                     col1, col2, col3 = st.columns(3)
                     with col1:
@@ -402,21 +583,21 @@ def main():
                     with col3:
                         st.success("✅ **Popularity Boost**")
                     
-                    for i, (_, med) in enumerate(rec_df.iterrows(), 1):
+                    # History symptoms/categories are the same for every recommendation
+                    user_treats_set, user_types_set = query_or_default(get_history_profile, tuple(history_to_use), default=(set(), set()))
+                    
+                    for i, med in enumerate(recommendations, 1):
                         st.markdown(f"**{i}.**")
                         display_medicine_card_db(med)
                         
                         with st.expander(f"💡 Why {med['name']}?", expanded=False):
-                            user_meds = execute_query(connection, f"SELECT treats, type FROM medicines WHERE name IN ({','.join(['%s'] * len(history_to_use))})", history_to_use)
-                            
-                            if not user_meds.empty:
-                                user_treats = pd.concat([pd.Series(str(t).split(',')) for t in user_meds['treats']]).str.strip().str.lower().unique()
-                                med_treats = [s.strip().lower() for s in str(med['treats']).split(',')]
+                            if user_types_set:
+                                med_treats = {s.strip().lower() for s in str(med['treats']).split(',')}
                                 
-                                if 'type' in user_meds and med['type'] in user_meds['type'].values:
+                                if med['type'] in user_types_set:
                                     st.markdown("• **Same Category** as your previous purchases")
                                 
-                                common = set(user_treats) & set(med_treats)
+                                common = user_treats_set & med_treats
                                 if common:
                                     st.markdown(f"• **Symptom Overlap**: {', '.join(list(common)[:2])}")
                                 
@@ -432,7 +613,7 @@ def main():
                     st.download_button(
                         label="Download Recommendations as JSON",
                         data=json_str,
-                        file_name=f"recommendations_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.json",
+                        file_name=f"recommendations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                         mime="application/json"
                     )
                 else:
@@ -451,22 +632,19 @@ def main():
         st.header("🗄️ Database Explorer")
         
         st.subheader("📊 Schema Overview")
-        stats = {}
-        for table in ['medicines', 'users', 'purchase_history']:
-            count = execute_query(connection, f"SELECT COUNT(*) as count FROM {table}")
-            stats[table] = count['count'].iloc[0] if not count.empty else 0
+        stats = query_or_default(load_table_counts, default={})
         
         col1, col2, col3 = st.columns(3)
-        with col1: st.metric("Medicines", stats['medicines'])
-        with col2: st.metric("Users", stats['users'])
-        with col3: st.metric("Purchases", stats['purchase_history'])
+        with col1: st.metric("Medicines", stats.get('medicines', 0))
+        with col2: st.metric("Users", stats.get('users', 0))
+        with col3: st.metric("Purchases", stats.get('purchase_history', 0))
         
         st.subheader("🔍 Browse Tables")
         table_choice = st.selectbox("Select Table:", ['medicines', 'users', 'purchase_history'])
         
         if table_choice == 'medicines':
             query = "SELECT name, type, rating, price, reviews FROM medicines ORDER BY rating DESC LIMIT 20"
-            data = execute_query(connection, query)
+            data = query_or_default(cached_query, query)
             st.dataframe(data, use_container_width=True)
         elif table_choice == 'users':
             query = """
@@ -476,7 +654,7 @@ def main():
             GROUP BY u.id, u.name, u.profile
             ORDER BY u.name
             """
-            data = execute_query(connection, query)
+            data = query_or_default(cached_query, query)
             st.dataframe(data, use_container_width=True)
         else:  # purchase_history
             query = """
@@ -486,23 +664,37 @@ def main():
             JOIN medicines m ON ph.medicine_id = m.id
             ORDER BY ph.purchase_date DESC
             """
-            data = execute_query(connection, query)
+            data = query_or_default(cached_query, query)
             st.dataframe(data, use_container_width=True)
         
         st.subheader("⚡ Custom SQL Query")
+        if str(CUSTOM_QUERY_TIMEOUT_MS) != CUSTOM_QUERY_TIMEOUT_MS_REQUESTED.strip():
+            st.warning(f"⚠️ CUSTOM_QUERY_TIMEOUT_MS={CUSTOM_QUERY_TIMEOUT_MS_REQUESTED!r} is not a whole number between 1 and {CUSTOM_QUERY_TIMEOUT_MAX_MS}; using {CUSTOM_QUERY_TIMEOUT_MS}.")
         custom_sql = st.text_area("Write your own query:", 
                                 value="SELECT * FROM medicines WHERE rating > 8.0 ORDER BY reviews DESC LIMIT 5",
                                 height=100,
                                 help="Try: SELECT name, type FROM medicines WHERE treats LIKE '%headache%'")
         
         if st.button("🔍 Run Custom Query") and custom_sql.strip():
-            with st.spinner("Executing custom query..."):
-                custom_results = execute_query(connection, custom_sql)
-                if not custom_results.empty:
-                    st.success(f"✅ Query returned {len(custom_results)} rows")
-                    st.dataframe(custom_results, use_container_width=True)
-                else:
-                    st.warning("No results returned")
+            statement = custom_sql.strip().rstrip(';').strip()
+            if not statement.lower().startswith(READ_ONLY_PREFIXES):
+                st.error("❌ Only SELECT, WITH and EXPLAIN queries are allowed")
+            elif has_multiple_statements(statement):
+                st.error("❌ Run one statement at a time")
+            elif accesses_server_files(statement):
+                st.error("❌ Queries that read or write server files (INTO OUTFILE, INTO DUMPFILE, LOAD_FILE) are not allowed")
+            else:
+                with st.spinner("Executing custom query..."):
+                    try:
+                        custom_results = execute_read_only_query(pool, statement)
+                    except Error as e:
+                        st.error(f"❌ **Query Error:** {e} | Custom queries are read-only and limited to {CUSTOM_QUERY_TIMEOUT_MS} ms")
+                    else:
+                        if not custom_results.empty:
+                            st.success(f"✅ Query returned {len(custom_results)} rows")
+                            st.dataframe(custom_results, use_container_width=True)
+                        else:
+                            st.warning("No results returned")
     
     st.markdown("---")
     col1, col2 = st.columns(2)
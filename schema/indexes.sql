@@ -0,0 +1,18 @@
+-- Secondary indexes for medisearch_db.
+-- app.py applies these at startup, skipping any index that already exists
+-- (checked against information_schema.statistics). One CREATE INDEX per
+-- statement; InnoDB builds one FULLTEXT index at a time.
+
+-- Sidebar user dropdown is ordered by name
+CREATE INDEX ix_users_name ON users (name);
+
+-- Full-text search (name+treats, name only, treats only)
+CREATE FULLTEXT INDEX ft_name_treats ON medicines (name, treats);
+CREATE FULLTEXT INDEX ft_name ON medicines (name);
+CREATE FULLTEXT INDEX ft_treats ON medicines (treats);
+
+-- Purchase counts and joins by medicine
+CREATE INDEX ix_ph_med ON purchase_history (medicine_id);
+
+-- Per-user history, newest first
+CREATE INDEX ix_ph_user_date ON purchase_history (user_id, purchase_date DESC);
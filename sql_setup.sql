@@ -87,6 +87,9 @@ INSERT INTO purchase_history (user_id, medicine_id, quantity) VALUES
 (5, 13, 4), -- Robert: Metformin
 (5, 15, 2); -- Robert: Januvia
 
+-- Secondary indexes (search, history, popularity) are in schema/indexes.sql;
+-- the app creates any that are missing at startup.
+
 
 -- Check everything loaded correctly
 SELECT COUNT(*) FROM medicines;  -- Should be 29
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+
+import app
+
+
+def test_into_outfile_is_rejected():
+    assert app.accesses_server_files("SELECT * FROM users INTO OUTFILE '/tmp/users.csv'")
+
+
+def test_into_dumpfile_is_rejected():
+    assert app.accesses_server_files("SELECT name FROM medicines LIMIT 1 into  dumpfile '/tmp/x'")
+
+
+def test_load_file_is_rejected():
+    assert app.accesses_server_files("SELECT LOAD_FILE('/etc/passwd')")
+
+
+def test_file_access_hidden_in_comments_is_rejected():
+    assert app.accesses_server_files("SELECT 1 INTO/**/OUTFILE '/tmp/x'")
+    assert app.accesses_server_files("SELECT /*!50000 load_file */('/etc/passwd')")
+
+
+def test_file_keywords_inside_strings_are_allowed():
+    assert not app.accesses_server_files("SELECT name FROM medicines WHERE treats LIKE '%into outfile%'")
+    assert not app.accesses_server_files('SELECT "LOAD_FILE(x)" AS label')
+
+
+def test_semicolon_inside_string_is_one_statement():
+    assert not app.has_multiple_statements("SELECT * FROM medicines WHERE treats LIKE '%;%'")
+    assert app.has_multiple_statements("SELECT 1; DROP TABLE users")